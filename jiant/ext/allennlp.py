@@ -1,3 +1,10 @@
+"""Code copied from AllenNLP (excluded from linting in .flake8 so that it stays close to upstream).
+
+Deliberate local changes, to keep in mind when comparing against upstream:
+    - SelfAttentiveSpanExtractor.forward builds the span mask from bool ops with a single float
+      cast, and clamps span indices directly instead of via relu on a float copy.
+    - get_range_vector creates the range directly on the target device.
+"""
 from typing import Optional
 
 import torch
@@ -77,13 +84,13 @@ class SelfAttentiveSpanExtractor(nn.Module):
         # We're using <= here (and for the mask below) because the span ends are
         # inclusive, so we want to include indices which are equal to span_widths rather
         # than using it as a non-inclusive upper bound.
-        span_mask = (max_span_range_indices <= span_widths).float()
         raw_span_indices = span_ends - max_span_range_indices
         # We also don't want to include span indices which are less than zero,
         # which happens because some spans near the beginning of the sequence
         # have an end index < max_batch_span_width, so we add this to the mask here.
-        span_mask = span_mask * (raw_span_indices >= 0).float()
-        span_indices = torch.nn.functional.relu(raw_span_indices.float()).long()
+        # The two conditions are combined as bool tensors and cast to float only once.
+        span_mask = ((max_span_range_indices <= span_widths) & (raw_span_indices >= 0)).float()
+        span_indices = raw_span_indices.clamp(min=0)
 
         # Shape: (batch_size * num_spans * max_batch_span_width)
         flat_span_indices = flatten_and_batch_shift_indices(span_indices, sequence_tensor.size(1))
@@ -315,14 +322,13 @@ def flatten_and_batch_shift_indices(indices: torch.Tensor, sequence_length: int)
     return offset_indices
 
 
-# noinspection PyUnresolvedReferences
 def get_range_vector(size: int, device: int) -> torch.Tensor:
     """
-    Returns a range vector with the desired size, starting at 0. The CUDA implementation
-    is meant to avoid copy data from CPU to GPU.
+    Returns a range vector with the desired size, starting at 0. The vector is created
+    directly on the target device, which avoids copying data from CPU to GPU.
     """
     if device > -1:
-        return torch.cuda.LongTensor(size, device=device).fill_(1).cumsum(0) - 1
+        return torch.arange(0, size, dtype=torch.long, device=torch.device("cuda", device))
     else:
         return torch.arange(0, size, dtype=torch.long)
 
@@ -216,7 +216,7 @@ class EqualMetricAggregator(BaseMetricAggregator):
 class WeightedMetricAggregator(BaseMetricAggregator):
     def __init__(self, weights_dict: Dict[str, float]):
         self.weights_dict = weights_dict
-        self.total_weights = sum([x for x in weights_dict.values()])
+        self.total_weights = sum(weights_dict.values())
 
     def aggregate(self, major_metrics_dict: Dict[str, float]):
         return (
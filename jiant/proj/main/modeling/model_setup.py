@@ -12,7 +12,9 @@ import jiant.proj.main.components.container_setup as container_setup
 import jiant.proj.main.modeling.primary as primary
 import jiant.utils.python.strings as strings
 
+from jiant.proj.main.modeling.heads import ClassificationHead
 from jiant.proj.main.modeling.heads import JiantHeadFactory
+from jiant.proj.main.modeling.heads import RegressionHead
 from jiant.proj.main.modeling.taskmodels import JiantTaskModelFactory, Taskmodel, MLMModel
 
 from jiant.shared.model_resolution import ModelArchitectures
@@ -24,6 +26,8 @@ def setup_jiant_model(
     model_config_path: str,
     task_dict: Dict[str, Task],
     taskmodels_config: container_setup.TaskmodelsConfig,
+    jit_script_heads: bool = False,
+    share_head_dense: bool = False,
 ):
     """Sets up tokenizer, encoder, and task models, and instantiates and returns a JiantModel.
 
@@ -46,6 +50,10 @@ def setup_jiant_model(
         model_config_path (str): Path to the JSON file containing the configuration parameters.
         task_dict (Dict[str, tasks.Task]): map from task name to task instance.
         taskmodels_config: maps mapping from tasks to models, and specifying task-model configs.
+        jit_script_heads (bool): If True, compile the classification and regression heads with
+            TorchScript (see script_taskmodel_heads()).
+        share_head_dense (bool): If True, share the hidden dense layer between the classification
+            and regression heads of all task models (see share_taskmodel_head_dense()).
 
     Returns:
         JiantModel nn.Module.
@@ -66,6 +74,10 @@ def setup_jiant_model(
             taskmodels_config.task_to_taskmodel_map
         ).items()
     }
+    if share_head_dense:
+        share_taskmodel_head_dense(taskmodels_dict=taskmodels_dict)
+    if jit_script_heads:
+        script_taskmodel_heads(taskmodels_dict=taskmodels_dict)
     return primary.JiantModel(
         task_dict=task_dict,
         encoder=encoder,
@@ -103,6 +115,7 @@ def delegate_load(jiant_model, weights_dict: dict, load_mode: str):
         TODO: return behavior is not consistent between load_mode options, clarify as needed here.
 
     """
+    check_tied_weights_match(jiant_model=jiant_model, weights_dict=weights_dict)
     if load_mode == "from_transformers":
         return load_encoder_from_transformers_weights(
             encoder=jiant_model.encoder, weights_dict=weights_dict,
@@ -138,6 +151,34 @@ def delegate_load(jiant_model, weights_dict: dict, load_mode: str):
         raise KeyError(load_mode)
 
 
+def check_tied_weights_match(jiant_model, weights_dict: dict):
+    """Check that weights_dict does not assign different values to parameters tied in jiant_model.
+
+    Loading such weights (e.g. a checkpoint with per-task head dense layers into a model built
+    with share_head_dense) would silently keep only the value of whichever key is loaded last.
+
+    Args:
+        jiant_model (JiantModel): jiant model (encoder and task models are core components).
+        weights_dict (Dict): model weights.
+
+    Raises:
+        ValueError if weights_dict has non-identical values for keys of a tied parameter.
+
+    """
+    tied_keys_dict = {}
+    for k, v in jiant_model.state_dict(keep_vars=True).items():
+        tied_keys_dict.setdefault((tuple(v.shape), v.data_ptr()), []).append(k)
+    for tied_keys in tied_keys_dict.values():
+        loaded_keys = [k for k in tied_keys if k in weights_dict]
+        for k in loaded_keys[1:]:
+            if not torch.equal(weights_dict[k], weights_dict[loaded_keys[0]]):
+                raise ValueError(
+                    "Cannot load different weights into tied parameters {} and {}".format(
+                        loaded_keys[0], k
+                    )
+                )
+
+
 def load_encoder_from_transformers_weights(
     encoder: nn.Module, weights_dict: dict, return_remainder=False
 ):
@@ -287,6 +328,70 @@ def create_taskmodel(task, encoder, **taskmodel_kwargs) -> Taskmodel:
     return taskmodel
 
 
+def share_taskmodel_head_dense(taskmodels_dict: Dict[str, Taskmodel]):
+    """Ties the hidden dense layer of the task models' pooled-output heads to a single module.
+
+    Classification and regression heads are a dense+tanh layer followed by a task-specific output
+    projection. With this, all such heads use the dense layer of the first head (tasks still keep
+    their own output projection), so the shared layer is trained jointly across tasks and its
+    parameters are stored, all-reduced and updated by the optimizer only once.
+
+    State dict keys are unchanged (each head still has its own dense.* keys, with equal values).
+    Loading weights whose head dense layers differ (e.g. from a model trained without sharing)
+    raises an error in delegate_load, rather than silently keeping one of them.
+
+    Args:
+        taskmodels_dict (Dict[str, Taskmodel]): map from task model name to task model.
+
+    """
+    shared_dense = None
+    for taskmodel in taskmodels_dict.values():
+        if isinstance(taskmodel.head, (ClassificationHead, RegressionHead)):
+            if shared_dense is None:
+                shared_dense = taskmodel.head.dense
+            else:
+                taskmodel.head.dense = shared_dense
+
+
+def script_taskmodel_heads(taskmodels_dict: Dict[str, Taskmodel]):
+    """Replaces the pooled-output heads of the task models with TorchScript-compiled versions.
+
+    Classification and regression heads are small fixed-shape MLPs that run on every batch, so
+    scripting them removes the per-op Python dispatch of their dropout/linear/tanh chain. Other
+    heads are left as-is, since they depend on modules that are not scriptable.
+
+    Args:
+        taskmodels_dict (Dict[str, Taskmodel]): map from task model name to task model.
+
+    """
+    for taskmodel in taskmodels_dict.values():
+        if isinstance(taskmodel.head, (ClassificationHead, RegressionHead)):
+            taskmodel.head = torch.jit.script(taskmodel.head)
+
+
+def compile_encoder(jiant_model: primary.JiantModel):
+    """Compiles the forward of the encoder shared by the task models with torch.compile.
+
+    The encoder dominates the cost of each step. Only its forward is replaced (every encode()
+    goes through it), so parameter names and saved/loaded state dicts are unaffected. Dynamic
+    shapes are enabled to avoid recompiling for every sequence length and batch size.
+
+    Notes:
+        The compiled forward is bound to this encoder instance, so this is not compatible with
+        nn.DataParallel (whose replicas copy the instance attributes), nor with FSDP (which
+        replaces the encoder's layers in place after compilation); use DistributedDataParallel
+        for multi-GPU training instead. setup_runner rejects both combinations.
+
+    Args:
+        jiant_model (primary.JiantModel): jiant model whose encoder should be compiled.
+
+    """
+    if not hasattr(torch, "compile"):
+        raise RuntimeError("torch.compile requires PyTorch >= 2.0.")
+    encoder = jiant_model.encoder
+    encoder.forward = torch.compile(encoder.forward, mode="reduce-overhead", dynamic=True)
+
+
 @dataclass
 class TransformersClassSpec:
     config_class: Any
@@ -11,6 +11,7 @@ import torch
 import torch.nn as nn
 
 import jiant.utils.python.strings as strings
+import jiant.utils.torch_utils as torch_utils
 from jiant.tasks.core import BatchMixin
 from jiant.tasks.core import FeaturizationSpec
 from jiant.tasks.core import Task
@@ -92,7 +93,7 @@ def wrap_jiant_forward(
     appropriate model output dataclass.
 
     Args:
-        jiant_model (Union[JiantModel, nn.DataParallel]):
+        jiant_model (Union[JiantModel, nn.DataParallel]): (optionally FSDP-wrapped) JiantModel.
         batch (BatchMixin): model input batch.
         task (Task): Task object passed for access in the taskmodel.
         compute_loss (bool): True if loss should be computed, False otherwise.
@@ -101,7 +102,9 @@ def wrap_jiant_forward(
         Union[LogitsOutput, LogitsAndLossOutput, EmbeddingOutput]: model output dataclass.
 
     """
-    assert isinstance(jiant_model, (JiantModel, nn.DataParallel))
+    assert isinstance(jiant_model, (JiantModel, nn.DataParallel)) or torch_utils.is_fully_sharded(
+        jiant_model
+    )
     is_multi_gpu = isinstance(jiant_model, nn.DataParallel)
     model_output = construct_output_from_dict(
         jiant_model(
@@ -541,7 +544,7 @@ class JiantBartModel(JiantTransformersModel):
         other = (enc_all + dec_all,)
 
         bsize, slen = input_ids.shape
-        batch_idx = torch.arange(bsize).to(input_ids.device)
+        batch_idx = torch.arange(bsize, device=input_ids.device)
         # Get last non-pad index
         pooled = unpooled[batch_idx, slen - input_ids.eq(self.config.pad_token_id).sum(1) - 1]
         return JiantModelOutput(pooled=pooled, unpooled=unpooled, other=other)
@@ -2,6 +2,7 @@ import abc
 
 import torch
 import torch.nn as nn
+import torch.nn.functional as F  # noqa PyPep8Naming
 
 from typing import Callable
 
@@ -9,6 +10,7 @@ import jiant.proj.main.modeling.heads as heads
 
 from jiant.proj.main.components.outputs import LogitsAndLossOutput
 from jiant.proj.main.components.outputs import LogitsOutput
+from jiant.tasks.lib.templates import mlm as mlm_template
 from jiant.utils.python.datastructures import take_one
 
 from jiant.tasks.core import TaskTypes
@@ -76,6 +78,7 @@ class ClassificationModel(Taskmodel):
     def __init__(self, task, encoder, head: heads.ClassificationHead, **kwargs):
 
         super().__init__(task=task, encoder=encoder, head=head)
+        self.loss_fct = nn.CrossEntropyLoss()
 
     def forward(self, batch, tokenizer, compute_loss: bool = False):
         encoder_output = self.encoder.encode(
@@ -83,8 +86,7 @@ class ClassificationModel(Taskmodel):
         )
         logits = self.head(pooled=encoder_output.pooled)
         if compute_loss:
-            loss_fct = nn.CrossEntropyLoss()
-            loss = loss_fct(logits.view(-1, self.head.num_labels), batch.label_id.view(-1),)
+            loss = self.loss_fct(logits.view(-1, self.head.num_labels), batch.label_id.view(-1),)
             return LogitsAndLossOutput(logits=logits, loss=loss, other=encoder_output.other)
         else:
             return LogitsOutput(logits=logits, other=encoder_output.other)
@@ -94,6 +96,7 @@ class ClassificationModel(Taskmodel):
 class RegressionModel(Taskmodel):
     def __init__(self, task, encoder, head: heads.RegressionHead, **kwargs):
         super().__init__(task=task, encoder=encoder, head=head)
+        self.loss_fct = nn.MSELoss()
 
     def forward(self, batch, tokenizer, compute_loss: bool = False):
         encoder_output = self.encoder.encode(
@@ -102,8 +105,7 @@ class RegressionModel(Taskmodel):
         # TODO: Abuse of notation - these aren't really logits  (issue #1187)
         logits = self.head(pooled=encoder_output.pooled)
         if compute_loss:
-            loss_fct = nn.MSELoss()
-            loss = loss_fct(logits.view(-1), batch.label.view(-1))
+            loss = self.loss_fct(logits.view(-1), batch.label.view(-1))
             return LogitsAndLossOutput(logits=logits, loss=loss, other=encoder_output.other)
         else:
             return LogitsOutput(logits=logits, other=encoder_output.other)
@@ -113,39 +115,28 @@ class RegressionModel(Taskmodel):
 class MultipleChoiceModel(Taskmodel):
     def __init__(self, task, encoder, head: heads.RegressionHead, **kwargs):
         super().__init__(task=task, encoder=encoder, head=head)
+        self.loss_fct = nn.CrossEntropyLoss()
         self.num_choices = task.NUM_CHOICES
 
     def forward(self, batch, tokenizer, compute_loss: bool = False):
-        choice_score_list = []
-        encoder_output_other_ls = []
-        for i in range(self.num_choices):
-            encoder_output = self.encoder.encode(
-                input_ids=batch.input_ids[:, i],
-                segment_ids=batch.segment_ids[:, i],
-                input_mask=batch.input_mask[:, i],
-            )
-            choice_score = self.head(pooled=encoder_output.pooled)
-            choice_score_list.append(choice_score)
-            encoder_output_other_ls.append(encoder_output.other)
-
-        reshaped_outputs = []
-        if encoder_output_other_ls[0]:
-            for j in range(len(encoder_output_other_ls[0])):
-                reshaped_outputs.append(
-                    [
-                        torch.stack([misc[j][layer_i] for misc in encoder_output_other_ls], dim=1,)
-                        for layer_i in range(len(encoder_output_other_ls[0][0]))
-                    ]
-                )
-            reshaped_outputs = tuple(reshaped_outputs)
-
-        logits = torch.cat(
-            [choice_score.unsqueeze(1).squeeze(-1) for choice_score in choice_score_list], dim=1
+        # Fold the choices into the batch dimension so that the encoder and head are each run
+        # once per batch: [batch_size, num_choices, seq_len] -> [batch_size * num_choices, seq_len]
+        seq_len = batch.input_ids.shape[-1]
+        encoder_output = self.encoder.encode(
+            input_ids=batch.input_ids.reshape(-1, seq_len),
+            segment_ids=batch.segment_ids.reshape(-1, seq_len),
+            input_mask=batch.input_mask.reshape(-1, seq_len),
         )
+        choice_scores = self.head(pooled=encoder_output.pooled)
+        logits = choice_scores.view(-1, self.num_choices)
+
+        if encoder_output.other:
+            reshaped_outputs = unfold_choices(encoder_output.other, num_choices=self.num_choices)
+        else:
+            reshaped_outputs = []
 
         if compute_loss:
-            loss_fct = nn.CrossEntropyLoss()
-            loss = loss_fct(logits.view(-1, self.num_choices), batch.label_id.view(-1))
+            loss = self.loss_fct(logits.view(-1, self.num_choices), batch.label_id.view(-1))
             return LogitsAndLossOutput(logits=logits, loss=loss, other=reshaped_outputs)
         else:
             return LogitsOutput(logits=logits, other=reshaped_outputs)
@@ -155,6 +146,7 @@ class MultipleChoiceModel(Taskmodel):
 class SpanComparisonModel(Taskmodel):
     def __init__(self, task, encoder, head: heads.SpanComparisonHead, **kwargs):
         super().__init__(task=task, encoder=encoder, head=head)
+        self.loss_fct = nn.CrossEntropyLoss()
 
     def forward(self, batch, tokenizer, compute_loss: bool = False):
         """Summary
@@ -172,8 +164,7 @@ class SpanComparisonModel(Taskmodel):
         )
         logits = self.head(unpooled=encoder_output.unpooled, spans=batch.spans)
         if compute_loss:
-            loss_fct = nn.CrossEntropyLoss()
-            loss = loss_fct(logits.view(-1, self.head.num_labels), batch.label_id.view(-1),)
+            loss = self.loss_fct(logits.view(-1, self.head.num_labels), batch.label_id.view(-1),)
             return LogitsAndLossOutput(logits=logits, loss=loss, other=encoder_output.other)
         else:
             return LogitsOutput(logits=logits, other=encoder_output.other)
@@ -183,6 +174,7 @@ class SpanComparisonModel(Taskmodel):
 class SpanPredictionModel(Taskmodel):
     def __init__(self, task, encoder, head: heads.TokenClassificationHead, **kwargs):
         super().__init__(task=task, encoder=encoder, head=head)
+        self.loss_fct = nn.CrossEntropyLoss()
         self.offset_margin = 1000
         # 1000 is a big enough number that exp(-1000) will be strict 0 in float32.
         # So that if we add 1000 to the valid dimensions in the input of softmax,
@@ -192,13 +184,14 @@ class SpanPredictionModel(Taskmodel):
         encoder_output = self.encoder.encode(
             input_ids=batch.input_ids, segment_ids=batch.segment_ids, input_mask=batch.input_mask,
         )
-        logits = self.head(unpooled=encoder_output.unpooled)
+        # The offset is applied in fp32: under bf16 autocast the head returns bf16 logits, whose
+        # precision around offset_margin (a step size of 4) would collapse the valid logits
+        logits = self.head(unpooled=encoder_output.unpooled).float()
         # Ensure logits in valid range is at least self.offset_margin higher than others
         logits_offset = logits.max() - logits.min() + self.offset_margin
         logits = logits + logits_offset * batch.selection_token_mask.unsqueeze(dim=2)
         if compute_loss:
-            loss_fct = nn.CrossEntropyLoss()
-            loss = loss_fct(
+            loss = self.loss_fct(
                 logits.transpose(dim0=1, dim1=2).flatten(end_dim=1), batch.gt_span_idxs.flatten(),
             )
             return LogitsAndLossOutput(logits=logits, loss=loss, other=encoder_output.other)
@@ -210,6 +203,7 @@ class SpanPredictionModel(Taskmodel):
 class MultiLabelSpanComparisonModel(Taskmodel):
     def __init__(self, task, encoder, head: heads.SpanComparisonHead, **kwargs):
         super().__init__(task=task, encoder=encoder, head=head)
+        self.loss_fct = nn.BCEWithLogitsLoss()
 
     def forward(self, batch, tokenizer, compute_loss: bool = False):
         encoder_output = self.encoder.encode(
@@ -217,8 +211,7 @@ class MultiLabelSpanComparisonModel(Taskmodel):
         )
         logits = self.head(unpooled=encoder_output.unpooled, spans=batch.spans)
         if compute_loss:
-            loss_fct = nn.BCEWithLogitsLoss()
-            loss = loss_fct(logits.view(-1, self.head.num_labels), batch.label_ids.float(),)
+            loss = self.loss_fct(logits.view(-1, self.head.num_labels), batch.label_ids.float(),)
             return LogitsAndLossOutput(logits=logits, loss=loss, other=encoder_output.other)
         else:
             return LogitsOutput(logits=logits, other=encoder_output.other)
@@ -230,6 +223,7 @@ class TokenClassificationModel(Taskmodel):
 
     def __init__(self, task, encoder, head: heads.TokenClassificationHead, **kwargs):
         super().__init__(task=task, encoder=encoder, head=head)
+        self.loss_fct = nn.CrossEntropyLoss()
 
     def forward(self, batch, tokenizer, compute_loss: bool = False):
         encoder_output = self.encoder.encode(
@@ -237,11 +231,10 @@ class TokenClassificationModel(Taskmodel):
         )
         logits = self.head(unpooled=encoder_output.unpooled)
         if compute_loss:
-            loss_fct = nn.CrossEntropyLoss()
             active_loss = batch.label_mask.view(-1) == 1
             active_logits = logits.view(-1, self.head.num_labels)[active_loss]
             active_labels = batch.label_ids.view(-1)[active_loss]
-            loss = loss_fct(active_logits, active_labels)
+            loss = self.loss_fct(active_logits, active_labels)
             return LogitsAndLossOutput(logits=logits, loss=loss, other=encoder_output.other)
         else:
             return LogitsOutput(logits=logits, other=encoder_output.other)
@@ -284,6 +277,17 @@ class MLMModel(Taskmodel):
             segment_ids=masked_batch.segment_ids,
             input_mask=masked_batch.input_mask,
         )
+        if compute_loss and self.training:
+            # Only the masked positions contribute to the loss, so only those are projected
+            # through the vocab-sized decoder. The returned logits are therefore
+            # [num_masked_tokens, vocab_size] during training.
+            selected = masked_batch.masked_lm_labels != mlm_template.NON_MASKED_TOKEN_LABEL_ID
+            logits = self.head(unpooled=encoder_output.unpooled[selected])
+            loss = compute_mlm_loss(
+                logits=logits, masked_lm_labels=masked_batch.masked_lm_labels[selected]
+            )
+            return LogitsAndLossOutput(logits=logits, loss=loss, other=encoder_output.other)
+
         logits = self.head(unpooled=encoder_output.unpooled)
         if compute_loss:
             loss = compute_mlm_loss(logits=logits, masked_lm_labels=masked_batch.masked_lm_labels)
@@ -297,6 +301,13 @@ class EmbeddingModel(Taskmodel):
     def __init__(self, task, encoder, head: heads.AbstractPoolerHead, **kwargs):
         super().__init__(task=task, encoder=encoder, head=head)
         self.layer = kwargs["layer"]
+        # Resolve the pooling call signature once, rather than type-checking the head every batch
+        if isinstance(head, heads.MeanPoolerHead):
+            self.pool_with_input_mask = True
+        elif isinstance(head, heads.FirstPoolerHead):
+            self.pool_with_input_mask = False
+        else:
+            raise TypeError(type(head))
 
     def forward(self, batch, tokenizer, compute_loss: bool = False):
         encoder_output = self.encoder.encode(
@@ -307,12 +318,10 @@ class EmbeddingModel(Taskmodel):
         hidden_states = take_one(encoder_output.other)
         layer_hidden_states = hidden_states[self.layer]
 
-        if isinstance(self.head, heads.MeanPoolerHead):
+        if self.pool_with_input_mask:
             logits = self.head(unpooled=layer_hidden_states, input_mask=batch.input_mask)
-        elif isinstance(self.head, heads.FirstPoolerHead):
-            logits = self.head(layer_hidden_states)
         else:
-            raise TypeError(type(self.head))
+            logits = self.head(layer_hidden_states)
 
         # TODO: Abuse of notation - these aren't really logits  (issue #1187)
         if compute_loss:
@@ -326,17 +335,52 @@ class EmbeddingModel(Taskmodel):
             return LogitsOutput(logits=logits, other=encoder_output.other)
 
 
+def unfold_choices(other, num_choices):
+    """Reshapes encoder outputs computed over flattened choices to the per-choice output layout.
+
+    Produces the same layout as encoding each choice separately and, for each element j of the
+    per-choice outputs, stacking the per-choice values of other[j][i] along dim 1 (for i in
+    range(len(other[0])) of the per-choice outputs).
+
+    Args:
+        other (tuple): encoder outputs (e.g. hidden states) computed over inputs of shape
+            [batch_size * num_choices, ...].
+        num_choices (int): number of choices per example.
+
+    Returns:
+        Tuple (over elements of other) of lists of tensors in the per-choice stacked layout.
+
+    """
+    if isinstance(other[0], torch.Tensor):
+        # The per-choice length of a tensor is its (unfolded) batch size
+        num_items = other[0].shape[0] // num_choices
+    else:
+        num_items = len(other[0])
+    return tuple(
+        [_unfold_choices_item(elem, i=i, num_choices=num_choices) for i in range(num_items)]
+        for elem in other
+    )
+
+
+def _unfold_choices_item(elem, i, num_choices):
+    if isinstance(elem, torch.Tensor):
+        # Indexing a tensor selects example i:
+        # [num_choices, seq_len, ...] -> [seq_len, num_choices, ...]
+        return elem.reshape(-1, num_choices, *elem.shape[1:])[i].transpose(0, 1)
+    else:
+        # Indexing a tuple of hidden states selects layer i: [batch_size, num_choices, ...]
+        return elem[i].reshape(-1, num_choices, *elem[i].shape[1:])
+
+
 def compute_mlm_loss(logits, masked_lm_labels):
     vocab_size = logits.shape[-1]
-    loss_fct = nn.CrossEntropyLoss()
-    return loss_fct(logits.view(-1, vocab_size), masked_lm_labels.view(-1))
+    return F.cross_entropy(logits.view(-1, vocab_size), masked_lm_labels.view(-1))
 
 
 def compute_qa_loss(logits, start_positions, end_positions):
     # Do we want to keep them as 1 tensor, or multiple?
-    # bs x 2 x seq_len x 1
+    # bs x 2 x seq_len
 
-    start_logits, end_logits = logits[:, 0], logits[:, 1]
     # Taken from: RobertaForQuestionAnswering
     # If we are on multi-GPU, split add a dimension
     if len(start_positions.size()) > 1:
@@ -344,12 +388,17 @@ def compute_qa_loss(logits, start_positions, end_positions):
     if len(end_positions.size()) > 1:
         end_positions = end_positions.squeeze(-1)
     # sometimes the start/end positions are outside our model inputs, we ignore these terms
-    ignored_index = start_logits.size(1)
+    ignored_index = logits.size(2)
     start_positions.clamp_(0, ignored_index)
     end_positions.clamp_(0, ignored_index)
 
-    loss_fct = nn.CrossEntropyLoss(ignore_index=ignored_index)
-    start_loss = loss_fct(start_logits, start_positions)
-    end_loss = loss_fct(end_logits, end_positions)
-    total_loss = (start_loss + end_loss) / 2
+    # Score the start and end positions in a single cross-entropy call, treating seq_len as
+    # the class dimension: bs x seq_len x 2 logits against bs x 2 positions
+    positions = torch.stack([start_positions, end_positions], dim=1)
+    position_losses = F.cross_entropy(
+        logits.transpose(1, 2), positions, ignore_index=ignored_index, reduction="none"
+    )
+    # Average the start and end losses separately over non-ignored positions, then together
+    num_valid = (positions != ignored_index).sum(dim=0)
+    total_loss = (position_losses.sum(dim=0) / num_valid).mean()
     return total_loss
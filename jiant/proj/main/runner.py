@@ -1,3 +1,4 @@
+import contextlib
 from typing import Dict
 from dataclasses import dataclass
 
@@ -23,6 +24,7 @@ class RunnerParameters(ExtendedDataClassMixin):
     n_gpu: int
     fp16: bool
     max_grad_norm: float
+    bf16: bool = False
 
 
 @dataclass
@@ -97,18 +99,20 @@ class JiantRunner:
         task_name, task = self.jiant_task_container.task_sampler.pop()
         task_specific_config = self.jiant_task_container.task_specific_configs[task_name]
 
+        # Accumulate the loss on-device, so that we only synchronize with the GPU once per step
         loss_val = 0
         for i in range(task_specific_config.gradient_accumulation_steps):
             batch, batch_metadata = train_dataloader_dict[task_name].pop()
             batch = batch.to(self.device)
-            model_output = wrap_jiant_forward(
-                jiant_model=self.jiant_model, batch=batch, task=task, compute_loss=True,
-            )
+            with bf16_autocast(device=self.device, enabled=self.rparams.bf16):
+                model_output = wrap_jiant_forward(
+                    jiant_model=self.jiant_model, batch=batch, task=task, compute_loss=True,
+                )
             loss = self.complex_backpropagate(
                 loss=model_output.loss,
                 gradient_accumulation_steps=task_specific_config.gradient_accumulation_steps,
             )
-            loss_val += loss.item()
+            loss_val += loss.detach()
 
         self.optimizer_scheduler.step()
         self.optimizer_scheduler.optimizer.zero_grad()
@@ -120,7 +124,8 @@ class JiantRunner:
                 "task": task_name,
                 "task_step": train_state.task_steps[task_name],
                 "global_step": train_state.global_steps,
-                "loss_val": loss_val / task_specific_config.gradient_accumulation_steps,
+                "loss_val": torch_utils.get_val(loss_val)
+                / task_specific_config.gradient_accumulation_steps,
             },
         )
 
@@ -142,6 +147,7 @@ class JiantRunner:
                 device=self.device,
                 local_rank=self.rparams.local_rank,
                 return_preds=return_preds,
+                bf16=self.rparams.bf16,
                 verbose=verbose,
             )
         return evaluate_dict
@@ -158,6 +164,7 @@ class JiantRunner:
                 device=self.device,
                 local_rank=self.rparams.local_rank,
                 verbose=verbose,
+                bf16=self.rparams.bf16,
             )
         return evaluate_dict
 
@@ -260,6 +267,7 @@ def run_val(
     local_rank,
     return_preds=False,
     verbose=True,
+    bf16=False,
 ):
     # Reminder:
     #   val_dataloader contains mostly PyTorch-relevant info
@@ -277,11 +285,13 @@ def run_val(
     ):
         batch = batch.to(device)
 
-        with torch.no_grad():
+        with torch.no_grad(), bf16_autocast(device=device, enabled=bf16):
             model_output = wrap_jiant_forward(
                 jiant_model=jiant_model, batch=batch, task=task, compute_loss=True,
             )
-        batch_logits = model_output.logits.detach().cpu().numpy()
+        # Logits are cast back to fp32, since numpy (and the metrics computed from the
+        # accumulated logits) do not support bf16
+        batch_logits = model_output.logits.detach().float().cpu().numpy()
         batch_loss = model_output.loss.mean().item()
         total_eval_loss += batch_loss
         eval_accumulator.update(
@@ -321,6 +331,7 @@ def run_test(
     local_rank,
     verbose=True,
     return_preds=True,
+    bf16=False,
 ):
     if not local_rank == -1:
         return
@@ -333,11 +344,13 @@ def run_test(
     ):
         batch = batch.to(device)
 
-        with torch.no_grad():
+        with torch.no_grad(), bf16_autocast(device=device, enabled=bf16):
             model_output = wrap_jiant_forward(
                 jiant_model=jiant_model, batch=batch, task=task, compute_loss=False,
             )
-        batch_logits = model_output.logits.detach().cpu().numpy()
+        # Logits are cast back to fp32, since numpy (and the metrics computed from the
+        # accumulated logits) do not support bf16
+        batch_logits = model_output.logits.detach().float().cpu().numpy()
         eval_accumulator.update(
             batch_logits=batch_logits, batch_loss=0, batch=batch, batch_metadata=batch_metadata,
         )
@@ -349,3 +362,16 @@ def run_test(
             task=task, accumulator=eval_accumulator,
         )
     return output
+
+
+def bf16_autocast(device, enabled):
+    """Returns a context manager that runs ops in bfloat16 mixed precision if enabled.
+
+    bf16 has the same exponent range as fp32, so unlike apex fp16 no loss scaling is needed.
+    torch.autocast is only touched when enabled, since it requires PyTorch >= 1.10.
+    """
+    if not enabled:
+        return contextlib.nullcontext()
+    return torch.autocast(
+        device_type=torch.device(device).type, dtype=torch.bfloat16, enabled=enabled
+    )
@@ -11,6 +11,7 @@ import jiant.shared.initialization as initialization
 import jiant.shared.distributed as distributed
 import jiant.shared.model_setup as model_setup
 import jiant.utils.python.io as py_io
+import jiant.utils.torch_utils as torch_utils
 import jiant.utils.zconf as zconf
 
 
@@ -25,6 +26,9 @@ class RunConfiguration(zconf.RunConfig):
     model_path = zconf.attr(type=str, required=True)
     model_config_path = zconf.attr(default=None, type=str)
     model_load_mode = zconf.attr(default="from_transformers", type=str)
+    jit_script_heads = zconf.attr(action="store_true")
+    share_head_dense = zconf.attr(action="store_true")
+    torch_compile = zconf.attr(action="store_true")
 
     # === Running Setup === #
     do_train = zconf.attr(action="store_true")
@@ -52,7 +56,10 @@ class RunConfiguration(zconf.RunConfig):
     no_cuda = zconf.attr(action="store_true")
     fp16 = zconf.attr(action="store_true")
     fp16_opt_level = zconf.attr(default="O1", type=str)
+    bf16 = zconf.attr(action="store_true")
+    allow_tf32 = zconf.attr(action="store_true")
     local_rank = zconf.attr(default=-1, type=int)
+    fsdp = zconf.attr(action="store_true")
     server_ip = zconf.attr(default="", type=str)
     server_port = zconf.attr(default="", type=str)
 
@@ -80,6 +87,12 @@ def setup_runner(
         jiant_runner.JiantRunner
 
     """
+    assert not (args.fp16 and args.bf16), "fp16 and bf16 are mutually exclusive"
+    # Scripted heads bypass apex amp's function patching, so they would get fp16 inputs with
+    # fp32 weights
+    assert not (args.fp16 and args.jit_script_heads), "jit_script_heads is not supported with fp16"
+    if args.bf16 and not hasattr(torch, "autocast"):
+        raise RuntimeError("bf16 training requires PyTorch >= 1.10 (torch.autocast).")
     # TODO document why the distributed.only_first_process() context manager is being used here.
     with distributed.only_first_process(local_rank=args.local_rank):
         # load the model
@@ -88,12 +101,31 @@ def setup_runner(
             model_config_path=args.model_config_path,
             task_dict=jiant_task_container.task_dict,
             taskmodels_config=jiant_task_container.taskmodels_config,
+            jit_script_heads=args.jit_script_heads,
+            share_head_dense=args.share_head_dense,
         )
         jiant_model_setup.delegate_load_from_path(
             jiant_model=jiant_model, weights_path=args.model_path, load_mode=args.model_load_mode
         )
         jiant_model.to(quick_init_out.device)
-
+        if args.torch_compile:
+            # The compiled forward is bound to this encoder instance, so DataParallel replicas
+            # (which copy the instance __dict__) would all call the original cuda:0 module
+            assert quick_init_out.n_gpu <= 1, "torch_compile is not supported with DataParallel"
+            assert not args.fsdp, "torch_compile is not supported with FSDP"
+            jiant_model_setup.compile_encoder(jiant_model)
+
+    if args.fsdp:
+        assert args.local_rank != -1, "FSDP requires distributed training"
+        assert not args.fp16, "FSDP is not supported with apex fp16"
+        assert not args.jit_script_heads, "FSDP cannot flatten the parameters of scripted heads"
+        # FSDP flattens and shards the parameters, so the optimizer must be created afterwards
+        jiant_model = model_setup.parallelize_fsdp(
+            model=jiant_model,
+            local_rank=args.local_rank,
+            # Shard each encoder layer; the encoder is shared by all task models
+            wrap_module_classes=torch_utils.get_module_list_item_classes(jiant_model.encoder),
+        )
     optimizer_scheduler = model_setup.create_optimizer(
         model=jiant_model,
         learning_rate=args.learning_rate,
@@ -110,6 +142,7 @@ def setup_runner(
         fp16_opt_level=args.fp16_opt_level,
         n_gpu=quick_init_out.n_gpu,
         local_rank=args.local_rank,
+        fsdp=args.fsdp,
     )
     optimizer_scheduler.optimizer = optimizer
     rparams = jiant_runner.RunnerParameters(
@@ -117,6 +150,7 @@ def setup_runner(
         n_gpu=quick_init_out.n_gpu,
         fp16=args.fp16,
         max_grad_norm=args.max_grad_norm,
+        bf16=args.bf16,
     )
     runner = jiant_runner.JiantRunner(
         jiant_task_container=jiant_task_container,
@@ -27,6 +27,9 @@ class RunConfiguration(zconf.RunConfig):
     hf_pretrained_model_name_or_path = zconf.attr(type=str, required=True)
     model_weights_path = zconf.attr(type=str, default=None)
     model_cache_path = zconf.attr(type=str, default=None)
+    jit_script_heads = zconf.attr(action="store_true")
+    share_head_dense = zconf.attr(action="store_true")
+    torch_compile = zconf.attr(action="store_true")
 
     # === Task parameters === #
     tasks = zconf.attr(type=str, default=None)
@@ -65,7 +68,10 @@ class RunConfiguration(zconf.RunConfig):
     no_cuda = zconf.attr(action="store_true")
     fp16 = zconf.attr(action="store_true")
     fp16_opt_level = zconf.attr(default="O1", type=str)
+    bf16 = zconf.attr(action="store_true")
+    allow_tf32 = zconf.attr(action="store_true")
     local_rank = zconf.attr(default=-1, type=int)
+    fsdp = zconf.attr(action="store_true")
     server_ip = zconf.attr(default="", type=str)
     server_port = zconf.attr(default="", type=str)
 
@@ -222,6 +228,9 @@ def run_simple(args: RunConfiguration, with_continue: bool = False):
                 model_cache_path, hf_config.model_type, "model", "config.json",
             ),
             model_load_mode=model_load_mode,
+            jit_script_heads=args.jit_script_heads,
+            share_head_dense=args.share_head_dense,
+            torch_compile=args.torch_compile,
             # === Running Setup === #
             do_train=bool(args.train_tasks),
             do_val=bool(args.val_tasks),
@@ -246,7 +255,10 @@ def run_simple(args: RunConfiguration, with_continue: bool = False):
             no_cuda=args.no_cuda,
             fp16=args.fp16,
             fp16_opt_level=args.fp16_opt_level,
+            bf16=args.bf16,
+            allow_tf32=args.allow_tf32,
             local_rank=args.local_rank,
+            fsdp=args.fsdp,
             server_ip=args.server_ip,
             server_port=args.server_port,
         )
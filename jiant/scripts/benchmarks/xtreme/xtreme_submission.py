@@ -41,6 +41,9 @@ class RunConfiguration(zconf.RunConfig):
     model_path = zconf.attr(type=str, required=True)
     model_config_path = zconf.attr(default=None, type=str)
     model_load_mode = zconf.attr(default="from_ptt", type=str)
+    jit_script_heads = zconf.attr(action="store_true")
+    share_head_dense = zconf.attr(action="store_true")
+    torch_compile = zconf.attr(action="store_true")
 
     # === Nuisance Parameters === #
     # Required for quickly setting up runner
@@ -54,7 +57,10 @@ class RunConfiguration(zconf.RunConfig):
     no_cuda = zconf.attr(action="store_true")
     fp16 = zconf.attr(action="store_true")
     fp16_opt_level = zconf.attr(default="O1", type=str)
+    bf16 = zconf.attr(action="store_true")
+    allow_tf32 = zconf.attr(action="store_true")
     local_rank = zconf.attr(default=-1, type=int)
+    fsdp = zconf.attr(action="store_true")
     server_ip = zconf.attr(default="", type=str)
     server_port = zconf.attr(default="", type=str)
     force_overwrite = zconf.attr(action="store_true")
@@ -258,6 +264,7 @@ def generate_and_write_preds_for_qa(
                 local_rank=runner.rparams.local_rank,
                 return_preds=False,
                 verbose=True,
+                bf16=runner.rparams.bf16,
             )
     else:
         raise KeyError(phase)
@@ -33,7 +33,11 @@ def quick_init(args, verbose=True) -> QuickInitContainer:
         print_args(args)
     init_server_logging(server_ip=args.server_ip, server_port=args.server_port, verbose=verbose)
     device, n_gpu = init_cuda_from_args(
-        no_cuda=args.no_cuda, local_rank=args.local_rank, fp16=args.fp16, verbose=verbose,
+        no_cuda=args.no_cuda,
+        local_rank=args.local_rank,
+        fp16=args.fp16,
+        allow_tf32=args.allow_tf32,
+        verbose=verbose,
     )
     args.seed = init_seed(given_seed=args.seed, n_gpu=n_gpu, verbose=verbose)
     init_output_dir(output_dir=args.output_dir, force_overwrite=args.force_overwrite)
@@ -61,7 +65,7 @@ def init_server_logging(server_ip, server_port, verbose=True):
         ptvsd.wait_for_attach()
 
 
-def init_cuda_from_args(no_cuda, local_rank, fp16, verbose=True):
+def init_cuda_from_args(no_cuda, local_rank, fp16, allow_tf32=False, verbose=True):
     """Perform initial CUDA setup for DistributedDataParallel, DataParallel or w/o CUDA configs.
 
     Adapted from Hugging Face template: https://github.com/huggingface/transformers/blob/ac99217e92
@@ -71,6 +75,8 @@ def init_cuda_from_args(no_cuda, local_rank, fp16, verbose=True):
         no_cuda (bool): True to ignore CUDA devices (i.e., use CPU instead).
         local_rank (int): Which GPU the script should use in DistributedDataParallel mode.
         fp16 (bool): True for half-precision mode.
+        allow_tf32 (bool): True to allow TensorFloat-32 for matmuls and cuDNN convolutions on
+            Ampere (and newer) GPUs.
         verbose: True to print device, device count, and whether training is distributed or FP16.
 
     Notes:
@@ -95,6 +101,9 @@ def init_cuda_from_args(no_cuda, local_rank, fp16, verbose=True):
         # Initializes the distributed backend which will take care of synchronizing nodes/GPUs
         # noinspection PyUnresolvedReferences
         torch.distributed.init_process_group(backend="nccl")
+    if allow_tf32:
+        torch.backends.cuda.matmul.allow_tf32 = True
+        torch.backends.cudnn.allow_tf32 = True
     if verbose:
         print(
             "device: {} n_gpu: {}, distributed training: {}, 16-bits training: {}".format(
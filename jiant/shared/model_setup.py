@@ -149,7 +149,46 @@ def parallelize_dist(model, local_rank):
     )
 
 
-def raw_special_model_setup(model, optimizer, fp16, fp16_opt_level, n_gpu, local_rank):
+def parallelize_fsdp(model, local_rank, wrap_module_classes):
+    """Wrap model in FullyShardedDataParallel, sharding parameters, gradients and optimizer state.
+
+    Each submodule that is an instance of one of wrap_module_classes (e.g. the encoder's
+    transformer layer classes) becomes its own FSDP unit, and everything else (embeddings, task
+    heads, and MLM decoders tied to the word embeddings) stays together in the root unit. Modules
+    reachable through several paths, such as an encoder shared by all task models, are wrapped
+    only once. Gradients and optimizer state are sharded, but parameters are kept gathered between
+    forward and backward (ZeRO-2).
+
+    Original parameter names are kept (use_orig_params), so that optimizer parameter groups
+    (e.g. no weight decay for biases and LayerNorm weights) can still be built from them.
+
+    Args:
+        model (nn.Module): torch model object.
+        local_rank (int): Which GPU the script should use in distributed mode.
+        wrap_module_classes (Set[type]): module classes to wrap as individual FSDP units.
+
+    Notes:
+        Requires PyTorch >= 2.1. The optimizer must be created after the model is wrapped.
+
+    Returns:
+        FullyShardedDataParallel-wrapped model.
+
+    """
+    if tuple(int(x) for x in torch.__version__.split(".")[:2]) < (2, 1):
+        raise ImportError("FullyShardedDataParallel support requires PyTorch >= 2.1.")
+    from torch.distributed.fsdp import FullyShardedDataParallel, ShardingStrategy
+    from torch.distributed.fsdp.wrap import ModuleWrapPolicy
+
+    return FullyShardedDataParallel(
+        model,
+        auto_wrap_policy=ModuleWrapPolicy(wrap_module_classes),
+        sharding_strategy=ShardingStrategy.SHARD_GRAD_OP,
+        device_id=local_rank,
+        use_orig_params=True,
+    )
+
+
+def raw_special_model_setup(model, optimizer, fp16, fp16_opt_level, n_gpu, local_rank, fsdp=False):
     """Perform setup for special modes (e.g., FP16, DataParallel, and/or DistributedDataParallel.
 
     Args:
@@ -159,6 +198,8 @@ def raw_special_model_setup(model, optimizer, fp16, fp16_opt_level, n_gpu, local
         fp16_opt_level (str): Apex AMP optimization level default mode identifier.
         n_gpu: number of GPUs.
         local_rank (int): Which GPU the script should use in DistributedDataParallel mode.
+        fsdp (bool): True if model has already been wrapped with parallelize_fsdp(), in which
+            case it is not additionally wrapped in DistributedDataParallel.
 
     Notes:
         Initialization steps performed in init_cuda_from_args() set n_gpu = 1 when local_rank != -1.
@@ -171,7 +212,7 @@ def raw_special_model_setup(model, optimizer, fp16, fp16_opt_level, n_gpu, local
         model, optimizer = fp16ize(model=model, optimizer=optimizer, fp16_opt_level=fp16_opt_level)
     if n_gpu > 1:
         model = parallelize_gpu(model=model)
-    if local_rank != -1:
+    if local_rank != -1 and not fsdp:
         model = parallelize_dist(model=model, local_rank=local_rank)
     return model, optimizer
 
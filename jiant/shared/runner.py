@@ -23,6 +23,10 @@ def complex_backpropagate(
         with amp.scale_loss(loss, optimizer) as scaled_loss:
             scaled_loss.backward()
         torch.nn.utils.clip_grad_norm_(amp.master_params(optimizer), max_grad_norm)
+    elif torch_utils.is_fully_sharded(model):
+        loss.backward()
+        # Gradients are sharded, so the norm must be computed across all ranks
+        model.clip_grad_norm_(max_grad_norm)
     else:
         loss.backward()
         torch.nn.utils.clip_grad_norm_(model.parameters(), max_grad_norm)
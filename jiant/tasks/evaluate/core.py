@@ -142,8 +142,8 @@ class SpanPredictionF1andEMScheme(BaseEvaluationScheme):
 
     @classmethod
     def compute_metrics_from_preds_and_labels(cls, preds, labels):
-        em = sum([exact_match_score(s1, s2) for s1, s2 in zip(preds, labels)]) / len(labels)
-        f1 = sum([string_f1_score(s1, s2) for s1, s2 in zip(preds, labels)]) / len(labels)
+        em = sum(exact_match_score(s1, s2) for s1, s2 in zip(preds, labels)) / len(labels)
+        f1 = sum(string_f1_score(s1, s2) for s1, s2 in zip(preds, labels)) / len(labels)
         scores = {"f1": f1, "em": em, "avg": (f1 + em) / 2}
         return Metrics(major=scores["avg"], minor=scores)
 
@@ -362,25 +362,29 @@ def knn_gpu(x, y, k, mem=5 * 1024 * 1024 * 1024):
     batch_size = mem // (dim * 4)
     sim = np.zeros((x.shape[0], k), dtype=np.float32)
     ind = np.zeros((x.shape[0], k), dtype=np.int64)
+    y_chunks = [
+        (yfrom, min(yfrom + batch_size, y.shape[0])) for yfrom in range(0, y.shape[0], batch_size)
+    ]
+    num_candidates = sum(min(k, yto - yfrom) for yfrom, yto in y_chunks)
     for xfrom in range(0, x.shape[0], batch_size):
         xto = min(xfrom + batch_size, x.shape[0])
-        bsims, binds = [], []
-        for yfrom in range(0, y.shape[0], batch_size):
-            yto = min(yfrom + batch_size, y.shape[0])
+        # Write each y-chunk's candidates into preallocated buffers instead of concatenating
+        bsims = np.empty((xto - xfrom, num_candidates), dtype=np.float32)
+        binds = np.empty((xto - xfrom, num_candidates), dtype=np.int64)
+        col = 0
+        for yfrom, yto in y_chunks:
             idx = faiss.IndexFlatIP(dim)
             idx = faiss.index_cpu_to_all_gpus(idx)
             idx.add(y[yfrom:yto])
-            bsim, bind = idx.search(x[xfrom:xto], min(k, yto - yfrom))
-            bsims.append(bsim)
-            binds.append(bind + yfrom)
+            chunk_k = min(k, yto - yfrom)
+            bsim, bind = idx.search(x[xfrom:xto], chunk_k)
+            bsims[:, col : col + chunk_k] = bsim
+            binds[:, col : col + chunk_k] = bind + yfrom
+            col += chunk_k
             del idx
-        bsims = np.concatenate(bsims, axis=1)
-        binds = np.concatenate(binds, axis=1)
-        aux = np.argsort(-bsims, axis=1)
-        for i in range(xfrom, xto):
-            for j in range(k):
-                sim[i, j] = bsims[i - xfrom, aux[i - xfrom, j]]
-                ind[i, j] = binds[i - xfrom, aux[i - xfrom, j]]
+        aux = np.argsort(-bsims, axis=1)[:, :k]
+        sim[xfrom:xto] = np.take_along_axis(bsims, aux, axis=1)
+        ind[xfrom:xto] = np.take_along_axis(binds, aux, axis=1)
     return sim, ind
 
 
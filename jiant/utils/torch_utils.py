@@ -8,6 +8,12 @@ import torch.nn.functional as F  # noqa PyPep8Naming
 
 from torch.utils.data import Dataset, DataLoader
 
+try:
+    from torch.distributed.fsdp import FullyShardedDataParallel
+except ImportError:
+    # Older versions of PyTorch do not have FSDP (the --fsdp option requires PyTorch >= 2.1)
+    FullyShardedDataParallel = None
+
 CPU_DEVICE = torch.device("cpu")
 
 
@@ -39,18 +45,20 @@ def compute_pred_entropy_clean(logits):
 
 
 def copy_state_dict(state_dict, target_device=None):
-    copied_state_dict = copy.deepcopy(state_dict)
     if target_device is None:
-        return copied_state_dict
+        return copy.deepcopy(state_dict)
     else:
+        # Copy straight to the target device rather than deep-copying first,
+        # which would duplicate every tensor on its source device (e.g. GPU)
+        # before moving it.
         # Ensures that tensors with the same data_ptrs point to the same
         # data_ptr after copying
         new_state_dict = {}
         unique_dict = {}
-        for k, v in copied_state_dict.items():
+        for k, v in state_dict.items():
             unique_key = tuple(v.shape), v.data_ptr()
             if unique_key not in unique_dict:
-                unique_dict[unique_key] = v.to(target_device)
+                unique_dict[unique_key] = v.detach().to(target_device, copy=True)
             # Create a view
             new_state_dict[k] = unique_dict[unique_key][:]
 
@@ -65,6 +73,16 @@ def get_parent_child_module_list(model):
     return ls
 
 
+def get_module_list_item_classes(torch_module):
+    """Returns the classes of the modules held in nn.ModuleLists, e.g. transformer layers."""
+    return {
+        type(item)
+        for module in torch_module.modules()
+        if isinstance(module, nn.ModuleList)
+        for item in module
+    }
+
+
 class IdentityModule(nn.Module):
     # noinspection PyMethodMayBeStatic
     def forward(self, *inputs):
@@ -130,6 +148,12 @@ def is_data_parallel(torch_module):
     return isinstance(torch_module, nn.DataParallel)
 
 
+def is_fully_sharded(torch_module):
+    if FullyShardedDataParallel is None:
+        return False
+    return isinstance(torch_module, FullyShardedDataParallel)
+
+
 def safe_save(obj, path, temp_path=None):
     if temp_path is None:
         temp_path = path + "._temp"
@@ -0,0 +1,100 @@
+import types
+
+import pytest
+import torch
+import torch.distributed as dist
+import torch.nn as nn
+import transformers
+
+import jiant.shared.model_setup as model_setup
+import jiant.utils.torch_utils as torch_utils
+from jiant.proj.main.modeling import heads
+from jiant.proj.main.modeling import primary
+from jiant.proj.main.modeling import taskmodels
+
+pytestmark = pytest.mark.skipif(
+    not dist.is_available() or tuple(int(x) for x in torch.__version__.split(".")[:2]) < (2, 1),
+    reason="FSDP support requires torch.distributed and PyTorch >= 2.1",
+)
+
+
+class _StubMLMHead(nn.Module):
+    def __init__(self, hidden_size, vocab_size):
+        super().__init__()
+        self.dense = nn.Linear(hidden_size, hidden_size)
+        self.decoder = nn.Linear(hidden_size, vocab_size)
+
+    def forward(self, unpooled):
+        return self.decoder(self.dense(unpooled))
+
+
+@pytest.fixture
+def process_group(tmp_path):
+    dist.init_process_group("gloo", init_method=f"file://{tmp_path}/pg", rank=0, world_size=1)
+    yield
+    dist.destroy_process_group()
+
+
+def test_parallelize_fsdp_with_shared_encoder_and_tied_mlm_decoder(process_group):
+    torch.manual_seed(0)
+    config = transformers.BertConfig(
+        vocab_size=50,
+        hidden_size=16,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=32,
+    )
+    encoder = primary.JiantTransformersModelFactory()(transformers.BertModel(config))
+    task = types.SimpleNamespace(name="task", LABELS=[0, 1])
+    mlm_head = _StubMLMHead(hidden_size=16, vocab_size=50)
+    mlm_head.decoder.weight = encoder.embeddings.word_embeddings.weight
+    jiant_model = primary.JiantModel(
+        task_dict={"task": task},
+        encoder=encoder,
+        taskmodels_dict={
+            "cls": taskmodels.ClassificationModel(
+                task=task,
+                encoder=encoder,
+                head=heads.ClassificationHead(task=task, hidden_size=16, hidden_dropout_prob=0.0),
+            ),
+            "mlm": taskmodels.MLMModel(task=task, encoder=encoder, head=mlm_head),
+        },
+        task_to_taskmodel_map={"task": "cls"},
+        tokenizer=None,
+    )
+    wrap_module_classes = torch_utils.get_module_list_item_classes(jiant_model.encoder)
+    assert wrap_module_classes == {transformers.models.bert.modeling_bert.BertLayer}
+
+    fsdp_model = model_setup.parallelize_fsdp(
+        model=jiant_model, local_rank=torch.device("cpu"), wrap_module_classes=wrap_module_classes
+    )
+    assert torch_utils.is_fully_sharded(fsdp_model)
+
+    # Original parameter names are kept, so biases and LayerNorm weights get no weight decay
+    optimizer_scheduler = model_setup.create_optimizer(
+        model=fsdp_model,
+        learning_rate=1e-3,
+        t_total=10,
+        warmup_steps=0,
+        warmup_proportion=None,
+        verbose=False,
+    )
+    decay_group, no_decay_group = optimizer_scheduler.optimizer.param_groups[:2]
+    assert decay_group["weight_decay"] > 0 and no_decay_group["weight_decay"] == 0
+    no_decay_ids = {id(p) for p in no_decay_group["params"]}
+    for name, param in fsdp_model.named_parameters():
+        if "bias" in name or "LayerNorm.weight" in name:
+            assert id(param) in no_decay_ids, name
+
+    batch = types.SimpleNamespace(
+        input_ids=torch.randint(50, (2, 5)),
+        segment_ids=torch.zeros(2, 5, dtype=torch.long),
+        input_mask=torch.ones(2, 5, dtype=torch.long),
+        label_id=torch.tensor([0, 1]),
+    )
+    model_output = primary.wrap_jiant_forward(
+        jiant_model=fsdp_model, batch=batch, task=task, compute_loss=True
+    )
+    model_output.loss.backward()
+    fsdp_model.clip_grad_norm_(1.0)
+    optimizer_scheduler.optimizer.step()
@@ -0,0 +1,79 @@
+import types
+
+import pytest
+import torch.nn as nn
+
+from jiant.proj.main.modeling import model_setup
+from jiant.proj.main.modeling.heads import ClassificationHead
+from jiant.proj.main.modeling.heads import RegressionHead
+from jiant.proj.main.modeling.primary import JiantModel
+from jiant.proj.main.modeling.taskmodels import ClassificationModel
+from jiant.proj.main.modeling.taskmodels import RegressionModel
+
+
+def _make_taskmodels_dict(hidden_size=4):
+    encoder = nn.Linear(hidden_size, hidden_size)
+    task = types.SimpleNamespace(name="task", LABELS=[0, 1, 2])
+    taskmodels_dict = {
+        "cls_a": ClassificationModel(
+            task=task,
+            encoder=encoder,
+            head=ClassificationHead(task=task, hidden_size=hidden_size, hidden_dropout_prob=0.1),
+        ),
+        "cls_b": ClassificationModel(
+            task=task,
+            encoder=encoder,
+            head=ClassificationHead(task=task, hidden_size=hidden_size, hidden_dropout_prob=0.1),
+        ),
+        "reg": RegressionModel(
+            task=task,
+            encoder=encoder,
+            head=RegressionHead(task=task, hidden_size=hidden_size, hidden_dropout_prob=0.1),
+        ),
+    }
+    return taskmodels_dict, encoder
+
+
+def test_share_taskmodel_head_dense_survives_scripting():
+    taskmodels_dict, encoder = _make_taskmodels_dict()
+    state_dict_keys = list(nn.ModuleDict(taskmodels_dict).state_dict().keys())
+
+    model_setup.share_taskmodel_head_dense(taskmodels_dict=taskmodels_dict)
+    model_setup.script_taskmodel_heads(taskmodels_dict=taskmodels_dict)
+
+    dense_weight = taskmodels_dict["cls_a"].head.dense.weight
+    assert taskmodels_dict["cls_b"].head.dense.weight is dense_weight
+    assert taskmodels_dict["reg"].head.dense.weight is dense_weight
+    # Output projections are still per-task
+    out_proj_weight = taskmodels_dict["cls_a"].head.out_proj.weight
+    assert taskmodels_dict["cls_b"].head.out_proj.weight is not out_proj_weight
+    assert list(nn.ModuleDict(taskmodels_dict).state_dict().keys()) == state_dict_keys
+
+
+def test_delegate_load_rejects_different_weights_for_shared_head_dense():
+    taskmodels_dict, encoder = _make_taskmodels_dict()
+    unshared_weights_dict = JiantModel(
+        task_dict={},
+        encoder=encoder,
+        taskmodels_dict=taskmodels_dict,
+        task_to_taskmodel_map={},
+        tokenizer=None,
+    ).state_dict()
+
+    taskmodels_dict, encoder = _make_taskmodels_dict()
+    model_setup.share_taskmodel_head_dense(taskmodels_dict=taskmodels_dict)
+    jiant_model = JiantModel(
+        task_dict={},
+        encoder=encoder,
+        taskmodels_dict=taskmodels_dict,
+        task_to_taskmodel_map={},
+        tokenizer=None,
+    )
+    # Weights saved from a model with a shared dense layer load fine
+    model_setup.delegate_load(
+        jiant_model=jiant_model, weights_dict=jiant_model.state_dict(), load_mode="all"
+    )
+    with pytest.raises(ValueError):
+        model_setup.delegate_load(
+            jiant_model=jiant_model, weights_dict=unshared_weights_dict, load_mode="all"
+        )
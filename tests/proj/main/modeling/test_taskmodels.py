@@ -0,0 +1,174 @@
+import types
+
+import pytest
+import torch
+import torch.nn as nn
+
+from jiant.proj.main.modeling.heads import RegressionHead
+from jiant.proj.main.modeling.heads import TokenClassificationHead
+from jiant.proj.main.modeling.primary import JiantModelOutput
+from jiant.proj.main.runner import bf16_autocast
+from jiant.proj.main.modeling.taskmodels import MLMModel
+from jiant.proj.main.modeling.taskmodels import MultipleChoiceModel
+from jiant.proj.main.modeling.taskmodels import SpanPredictionModel
+from jiant.proj.main.modeling.taskmodels import compute_qa_loss
+from jiant.tasks.lib.templates import mlm as mlm_template
+
+
+def _reference_qa_loss(logits, start_positions, end_positions):
+    ignored_index = logits.size(2)
+    start_positions = start_positions.clamp(0, ignored_index)
+    end_positions = end_positions.clamp(0, ignored_index)
+    loss_fct = nn.CrossEntropyLoss(ignore_index=ignored_index)
+    start_loss = loss_fct(logits[:, 0], start_positions)
+    end_loss = loss_fct(logits[:, 1], end_positions)
+    return (start_loss + end_loss) / 2
+
+
+def test_compute_qa_loss_matches_separate_start_end_losses():
+    torch.manual_seed(0)
+    logits = torch.randn(4, 7, 2).permute(0, 2, 1)
+    start_positions = torch.tensor([0, 3, 6, 2])
+    end_positions = torch.tensor([1, 5, 6, 9])  # 9 is outside the input, and is ignored
+    expected = _reference_qa_loss(logits, start_positions.clone(), end_positions.clone())
+    loss = compute_qa_loss(logits, start_positions.clone(), end_positions.clone())
+    assert torch.allclose(loss, expected)
+
+
+class _StubEncoder(nn.Module):
+    def __init__(self, vocab_size, hidden_size, nested_other):
+        super().__init__()
+        self.embeddings = nn.Embedding(vocab_size, hidden_size)
+        self.nested_other = nested_other
+
+    def encode(self, input_ids, segment_ids, input_mask):
+        hidden = self.embeddings(input_ids) * input_mask.unsqueeze(-1)
+        # Hidden states of each "layer": [batch_size, seq_len, hidden_size]
+        hidden_states = (hidden, hidden * 2, hidden + segment_ids.unsqueeze(-1))
+        other = (hidden_states,) if self.nested_other else hidden_states
+        return JiantModelOutput(pooled=hidden.mean(dim=1), unpooled=hidden, other=other)
+
+
+def _reference_multiple_choice_forward(model, batch):
+    # Encodes each choice separately, stacking the encoder outputs along dim 1
+    choice_score_list = []
+    encoder_output_other_ls = []
+    for i in range(model.num_choices):
+        encoder_output = model.encoder.encode(
+            input_ids=batch.input_ids[:, i],
+            segment_ids=batch.segment_ids[:, i],
+            input_mask=batch.input_mask[:, i],
+        )
+        choice_score_list.append(model.head(pooled=encoder_output.pooled))
+        encoder_output_other_ls.append(encoder_output.other)
+    reshaped_outputs = tuple(
+        [
+            torch.stack([misc[j][layer_i] for misc in encoder_output_other_ls], dim=1)
+            for layer_i in range(len(encoder_output_other_ls[0][0]))
+        ]
+        for j in range(len(encoder_output_other_ls[0]))
+    )
+    logits = torch.cat([choice_score for choice_score in choice_score_list], dim=1)
+    return logits, reshaped_outputs
+
+
+@pytest.mark.parametrize("nested_other", [False, True])
+def test_multiple_choice_model_matches_per_choice_encoding(nested_other):
+    torch.manual_seed(0)
+    batch_size, num_choices, seq_len, hidden_size = 2, 3, 5, 4
+    task = types.SimpleNamespace(NUM_CHOICES=num_choices)
+    model = MultipleChoiceModel(
+        task=task,
+        encoder=_StubEncoder(vocab_size=11, hidden_size=hidden_size, nested_other=nested_other),
+        head=RegressionHead(task=task, hidden_size=hidden_size, hidden_dropout_prob=0.0),
+    )
+    model.eval()
+    # Non-contiguous inputs, to check that folding the choices does not require contiguity
+    batch = types.SimpleNamespace(
+        input_ids=torch.randint(11, (num_choices, batch_size, seq_len)).transpose(0, 1),
+        segment_ids=torch.randint(2, (num_choices, batch_size, seq_len)).transpose(0, 1),
+        input_mask=torch.ones(num_choices, batch_size, seq_len, dtype=torch.long).transpose(0, 1),
+        label_id=torch.tensor([0, 2]),
+    )
+
+    output = model(batch=batch, tokenizer=None, compute_loss=True)
+    expected_logits, expected_other = _reference_multiple_choice_forward(model, batch)
+
+    assert output.logits.shape == (batch_size, num_choices)
+    assert torch.allclose(output.logits, expected_logits)
+    assert torch.allclose(output.loss, nn.CrossEntropyLoss()(expected_logits, batch.label_id))
+    assert len(output.other) == len(expected_other)
+    for elem, expected_elem in zip(output.other, expected_other):
+        assert len(elem) == len(expected_elem)
+        for tensor, expected_tensor in zip(elem, expected_elem):
+            assert tensor.shape == expected_tensor.shape
+            assert torch.allclose(tensor, expected_tensor)
+
+
+class _StubMLMHead(nn.Module):
+    def __init__(self, hidden_size, vocab_size):
+        super().__init__()
+        self.decoder = nn.Linear(hidden_size, vocab_size)
+
+    def forward(self, unpooled):
+        return self.decoder(unpooled)
+
+
+def test_mlm_model_training_loss_only_projects_masked_tokens():
+    torch.manual_seed(0)
+    batch_size, seq_len, hidden_size, vocab_size = 2, 6, 4, 11
+    masked_lm_labels = torch.full((batch_size, seq_len), mlm_template.NON_MASKED_TOKEN_LABEL_ID)
+    masked_lm_labels[0, 1] = 3
+    masked_lm_labels[1, 0] = 7
+    masked_lm_labels[1, 4] = 2
+    masked_batch = types.SimpleNamespace(
+        input_ids=torch.randint(vocab_size, (batch_size, seq_len)),
+        segment_ids=torch.zeros(batch_size, seq_len, dtype=torch.long),
+        input_mask=torch.ones(batch_size, seq_len, dtype=torch.long),
+        masked_lm_labels=masked_lm_labels,
+    )
+    batch = types.SimpleNamespace(get_masked=lambda **kwargs: masked_batch)
+    model = MLMModel(
+        task=types.SimpleNamespace(mlm_probability=0.15, do_mask=False),
+        encoder=_StubEncoder(vocab_size=vocab_size, hidden_size=hidden_size, nested_other=False),
+        head=_StubMLMHead(hidden_size=hidden_size, vocab_size=vocab_size),
+    )
+
+    model.eval()
+    eval_output = model(batch=batch, tokenizer=None, compute_loss=True)
+    assert eval_output.logits.shape == (batch_size, seq_len, vocab_size)
+
+    model.train()
+    train_output = model(batch=batch, tokenizer=None, compute_loss=True)
+    assert train_output.logits.shape == (3, vocab_size)
+    assert torch.allclose(train_output.loss, eval_output.loss)
+
+
+def test_span_prediction_model_keeps_logit_offset_precision_under_bf16_autocast():
+    torch.manual_seed(0)
+    batch_size, seq_len, hidden_size = 2, 6, 4
+    task = types.SimpleNamespace(LABELS=["start", "end"])
+    model = SpanPredictionModel(
+        task=task,
+        encoder=_StubEncoder(vocab_size=11, hidden_size=hidden_size, nested_other=False),
+        head=TokenClassificationHead(task=task, hidden_size=hidden_size, hidden_dropout_prob=0.0),
+    )
+    model.eval()
+    batch = types.SimpleNamespace(
+        input_ids=torch.randint(11, (batch_size, seq_len)),
+        segment_ids=torch.zeros(batch_size, seq_len, dtype=torch.long),
+        input_mask=torch.ones(batch_size, seq_len, dtype=torch.long),
+        selection_token_mask=torch.tensor([[0, 1, 1, 1, 1, 0], [0, 0, 1, 1, 1, 1]]),
+        gt_span_idxs=torch.tensor([[1, 3], [2, 5]]),
+    )
+
+    expected = model(batch=batch, tokenizer=None, compute_loss=True)
+    with bf16_autocast(device="cpu", enabled=True):
+        output = model(batch=batch, tokenizer=None, compute_loss=True)
+
+    assert output.logits.dtype == torch.float32
+    # Only the bf16 rounding of the head remains; the valid logits must not collapse together
+    assert torch.allclose(output.logits, expected.logits, atol=0.1)
+    valid_logits = output.logits[0, 1:5, 0]
+    assert len(set(valid_logits.tolist())) == len(valid_logits)
+    assert output.logits.argmax(dim=1).tolist() == expected.logits.argmax(dim=1).tolist()